@@ -2,9 +2,11 @@ from __future__ import annotations
 
 import sqlite3
 from pathlib import Path
+from typing import Any
 
 import streamlit as st
 import streamlit.components.v1 as components
+from streamlit.components.v1.custom_component import CustomComponent
 
 from todo import TaskId, TaskList, TaskRepository, SQLiteTaskRepository
 
@@ -12,23 +14,45 @@ from todo import TaskId, TaskList, TaskRepository, SQLiteTaskRepository
 st.set_page_config(page_title="Todo Tracker", layout="centered")
 
 DATABASE_PATH = Path("todo.db")
-
-task_reorder_component = components.declare_component(
-    "task_reorder", path=str(Path(__file__).parent / "components" / "task_reorder")
+TASK_LIST_KEY = "task-reorder"
+LAST_EVENT_KEY = "task-event-seq"
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=134217728",
 )
 
+TaskEvent = dict[str, Any]
+
+
+@st.cache_resource
+def get_task_reorder_component() -> CustomComponent:
+    return components.declare_component(
+        "task_reorder", path=str(Path(__file__).parent / "components" / "task_reorder")
+    )
+
 
-def render_reorder(tasks: TaskList) -> list[int] | None:
-    items = [
-        {"id": task.id, "title": task.title, "done": task.done}
-        for task in tasks
-    ]
-    return task_reorder_component(items=items, key="task-reorder", default=None)
+def render_task_items(version: int) -> list[TaskEvent] | None:
+    items = load_task_items(version)
+    task_reorder_component = get_task_reorder_component()
+    return task_reorder_component(
+        items=items,
+        applied_seq=st.session_state.get(LAST_EVENT_KEY, 0),
+        key=TASK_LIST_KEY,
+        default=None,
+    )
 
 
+# Opened once per process and shared by every session thread; the
+# repository serialises every statement on it.
 @st.cache_resource
 def get_connection() -> sqlite3.Connection:
-    return sqlite3.connect(DATABASE_PATH, check_same_thread=False)
+    connection = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
+    for pragma in CONNECTION_PRAGMAS:
+        connection.execute(pragma)
+    return connection
 
 
 @st.cache_resource
@@ -36,6 +60,16 @@ def get_repository() -> TaskRepository:
     return SQLiteTaskRepository(get_connection())
 
 
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_tasks(version: int) -> TaskList:
+    return get_repository().list_tasks()
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_task_items(version: int) -> list[tuple[int, str, bool]]:
+    return [(task.id, task.title, task.done) for task in load_tasks(version)]
+
+
 def handle_add(task_title: str) -> None:
     repository = get_repository()
     repository.add(task_title)
@@ -49,7 +83,57 @@ def handle_toggle(task_id: int) -> None:
 def handle_remove(task_id: int) -> None:
     repository = get_repository()
     repository.remove(TaskId(task_id))
-    st.session_state.pop(f"task-{task_id}", None)
+
+
+def handle_reorder(ordered_ids: list[int]) -> None:
+    repository = get_repository()
+    current_ids = [task.id for task in load_tasks(repository.version)]
+    if ordered_ids == current_ids or sorted(ordered_ids) != sorted(current_ids):
+        return
+    repository.reorder([TaskId(task_id) for task_id in ordered_ids])
+
+
+def handle_task_events(events: list[TaskEvent] | None) -> None:
+    # The component resends events until the app acknowledges them through
+    # applied_seq, so apply only those newer than the last one handled.
+    for event in sorted(events or [], key=lambda event: event["seq"]):
+        if event["seq"] <= st.session_state.get(LAST_EVENT_KEY, 0):
+            continue
+        st.session_state[LAST_EVENT_KEY] = event["seq"]
+
+        # Every event carries the order the user saw, including a drag that
+        # had not been reported yet, so apply it before the action itself.
+        handle_reorder(event["order"])
+        action = event["action"]
+        if action == "toggle":
+            handle_toggle(event["id"])
+        elif action == "remove":
+            handle_remove(event["id"])
+
+
+# Task list interactions only rerun this fragment; the task list
+# comes from the version-keyed cache, so untouched reruns skip SQLite.
+@st.fragment
+def render_task_list() -> None:
+    repository = get_repository()
+    # Apply the component's pending events before loading, so this run already
+    # renders the result and no follow-up rerun is needed.
+    handle_task_events(st.session_state.get(TASK_LIST_KEY))
+    # Read the version once so the counter and the rows share one snapshot.
+    version = repository.version
+    current_tasks: TaskList = load_tasks(version)
+
+    if not current_tasks:
+        st.success("All clear! Add your first task above.")
+        return
+
+    done_count = sum(task.done for task in current_tasks)
+    total_count = len(current_tasks)
+    st.write(f"**{done_count} / {total_count} tasks completed**")
+
+    st.caption("Drag to rearrange tasks and update their priority order.")
+
+    render_task_items(version)
 
 
 st.title("Streamlit Todo App")
@@ -65,39 +149,4 @@ with st.form("task-form", clear_on_submit=True):
     if submitted:
         handle_add(new_task)
 
-repository = get_repository()
-current_tasks: TaskList = repository.list_tasks()
-
-if not current_tasks:
-    st.success("All clear! Add your first task above.")
-else:
-    done_count, total_count = repository.completion_stats()
-    st.write(f"**{done_count} / {total_count} tasks completed**")
-
-    st.caption("Drag to rearrange tasks and update their priority order.")
-
-    reordered_ids = render_reorder(current_tasks)
-    if reordered_ids is not None and len(reordered_ids) == len(current_tasks):
-        current_order = [task.id for task in current_tasks]
-        if reordered_ids != current_order:
-            repository.reorder(reordered_ids)
-            st.experimental_rerun()
-
-    for task in current_tasks:
-        cols = st.columns([0.85, 0.15])
-        with cols[0]:
-            st.checkbox(
-                label=task.title,
-                value=task.done,
-                key=f"task-{task.id}",
-                on_change=handle_toggle,
-                args=(task.id,),
-            )
-        with cols[1]:
-            st.button(
-                "Remove",
-                key=f"remove-{task.id}",
-                use_container_width=True,
-                on_click=handle_remove,
-                args=(task.id,),
-            )
+render_task_list()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from todo import SQLiteTaskRepository
+
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+TASK_LIST_KEY = "task-reorder"
+
+
+@pytest.fixture
+def task_ids(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Generator[list[int], None, None]:
+    monkeypatch.chdir(tmp_path)
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    connection = sqlite3.connect("todo.db")
+    repo = SQLiteTaskRepository(connection)
+    ids = [task.id for task in map(repo.add, ["ship", "test", "deploy"]) if task]
+    connection.close()
+    yield ids
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+def _stored_tasks() -> list[tuple[str, int]]:
+    connection = sqlite3.connect("todo.db")
+    try:
+        return connection.execute(
+            "SELECT title, done FROM tasks ORDER BY position"
+        ).fetchall()
+    finally:
+        connection.close()
+
+
+def _run(app: AppTest, events: list[dict]) -> AppTest:
+    app.session_state[TASK_LIST_KEY] = events
+    return app.run()
+
+
+def test_every_queued_event_is_applied(task_ids: list[int]) -> None:
+    app = AppTest.from_file(str(APP_PATH)).run()
+    order = list(task_ids)
+
+    _run(
+        app,
+        [
+            {"seq": 1, "action": "toggle", "id": task_ids[0], "order": order},
+            {"seq": 2, "action": "toggle", "id": task_ids[2], "order": order},
+        ],
+    )
+
+    assert not app.exception
+    assert _stored_tasks() == [("ship", 1), ("test", 0), ("deploy", 1)]
+    assert "**2 / 3 tasks completed**" in [item.value for item in app.markdown]
+
+
+def test_acknowledged_events_are_not_applied_again(task_ids: list[int]) -> None:
+    app = AppTest.from_file(str(APP_PATH)).run()
+    order = list(task_ids)
+    first = {"seq": 1, "action": "toggle", "id": task_ids[0], "order": order}
+
+    _run(app, [first])
+    _run(app, [first])
+    second = {"seq": 2, "action": "toggle", "id": task_ids[1], "order": order}
+    _run(app, [first, second])
+
+    assert not app.exception
+    assert _stored_tasks() == [("ship", 1), ("test", 1), ("deploy", 0)]
+
+
+def test_event_order_is_applied_before_the_action(task_ids: list[int]) -> None:
+    app = AppTest.from_file(str(APP_PATH)).run()
+    dragged = [task_ids[2], task_ids[0], task_ids[1]]
+
+    _run(
+        app,
+        [
+            {"seq": 1, "action": "toggle", "id": task_ids[0], "order": dragged},
+            {"seq": 2, "action": "remove", "id": task_ids[1], "order": dragged},
+        ],
+    )
+
+    assert not app.exception
+    assert _stored_tasks() == [("deploy", 0), ("ship", 1)]
@@ -73,6 +73,18 @@ def test_remove_task_drops_only_target(repo: TaskRepository) -> None:
     assert remaining_ids == [one.id, three.id]
 
 
+def test_remove_task_keeps_remaining_order(repo: TaskRepository) -> None:
+    added = [repo.add(title) for title in ["ship", "test", "deploy", "announce"]]
+    assert all(task is not None for task in added)
+
+    repo.remove(added[0].id)
+
+    tasks = repo.list_tasks()
+    assert [task.title for task in tasks] == ["test", "deploy", "announce"]
+    assert [task.position for task in tasks] == [0, 1, 2]
+    assert repo.toggle(added[3].id).position == 2
+
+
 def test_tasks_are_returned_in_position_order(repo: TaskRepository) -> None:
     first = repo.add("ship")
     second = repo.add("test")
@@ -101,6 +113,55 @@ def test_reorder_updates_positions(repo: TaskRepository) -> None:
     assert [task.position for task in tasks] == [0, 1, 2]
 
 
+def test_reorder_to_the_current_order_is_a_no_op(repo: TaskRepository) -> None:
+    added = [repo.add(title) for title in ["ship", "test", "deploy"]]
+    assert all(task is not None for task in added)
+    ids = [task.id for task in added]
+
+    repo.reorder([ids[0], ids[2], ids[1]])
+    version = repo.version
+    repo.reorder([ids[0], ids[2], ids[1]])
+
+    assert repo.version == version
+    assert [task.title for task in repo.list_tasks()] == ["ship", "deploy", "test"]
+
+
+def test_sqlite_reorder_only_updates_moved_tasks() -> None:
+    connection = sqlite3.connect(":memory:")
+    try:
+        repo = SQLiteTaskRepository(connection)
+        added = [repo.add(title) for title in ["ship", "test", "deploy", "announce"]]
+        ids = [task.id for task in added if task is not None]
+
+        statements: list[str] = []
+        connection.set_trace_callback(statements.append)
+        repo.reorder([ids[0], ids[2], ids[1], ids[3]])
+        connection.set_trace_callback(None)
+
+        updates = [sql for sql in statements if sql.startswith("UPDATE")]
+        assert len(updates) == 4
+        tasks = repo.list_tasks()
+        assert [task.title for task in tasks] == ["ship", "deploy", "test", "announce"]
+        assert [task.position for task in tasks] == [0, 1, 2, 3]
+    finally:
+        connection.close()
+
+
+def test_reorder_rejects_unknown_or_duplicate_ids(repo: TaskRepository) -> None:
+    first = repo.add("ship")
+    second = repo.add("test")
+    assert first is not None and second is not None
+
+    with pytest.raises(ValueError):
+        repo.reorder([first.id, first.id])
+    with pytest.raises(ValueError):
+        repo.reorder([first.id, second.id + 100])
+
+    tasks = repo.list_tasks()
+    assert [task.id for task in tasks] == [first.id, second.id]
+    assert [task.position for task in tasks] == [0, 1]
+
+
 def test_completion_stats_counts_done_tasks(repo: TaskRepository) -> None:
     first = repo.add("ship")
     second = repo.add("test")
@@ -111,3 +172,99 @@ def test_completion_stats_counts_done_tasks(repo: TaskRepository) -> None:
     done, total = repo.completion_stats()
     assert done == 1
     assert total == 2
+
+
+def test_completion_stats_follow_removals(repo: TaskRepository) -> None:
+    first = repo.add("ship")
+    second = repo.add("test")
+    third = repo.add("deploy")
+    assert first is not None and second is not None and third is not None
+
+    repo.toggle(first.id)
+    repo.toggle(second.id)
+    repo.remove(first.id)
+    repo.remove(third.id)
+    repo.remove(third.id)
+
+    assert repo.completion_stats() == (1, 1)
+
+
+def test_version_changes_on_every_mutation(repo: TaskRepository) -> None:
+    versions = [repo.version]
+
+    first = repo.add("ship")
+    second = repo.add("test")
+    assert first is not None and second is not None
+    versions.append(repo.version)
+
+    repo.toggle(first.id)
+    versions.append(repo.version)
+
+    repo.reorder([second.id, first.id])
+    versions.append(repo.version)
+
+    repo.remove(first.id)
+    versions.append(repo.version)
+
+    repo.list_tasks()
+    repo.completion_stats()
+    assert repo.version == versions[-1]
+    assert versions == sorted(set(versions))
+
+
+def test_sqlite_repository_migrates_legacy_table_once() -> None:
+    connection = sqlite3.connect(":memory:")
+    try:
+        connection.execute(
+            "CREATE TABLE tasks (id INTEGER PRIMARY KEY, title TEXT, done INTEGER)"
+        )
+        connection.executemany(
+            "INSERT INTO tasks (id, title, done) VALUES (?, ?, 0)",
+            [(3, "ship"), (7, "test")],
+        )
+        connection.commit()
+
+        statements: list[str] = []
+        connection.set_trace_callback(statements.append)
+        repo = SQLiteTaskRepository(connection)
+        connection.set_trace_callback(None)
+        assert [task.position for task in repo.list_tasks()] == [0, 1]
+        verbs = [sql.split()[0] for sql in statements]
+        assert verbs.index("BEGIN") < verbs.index("ALTER") < verbs.index("COMMIT")
+        assert connection.execute("PRAGMA user_version").fetchone()[0] == 1
+
+        connection.execute("UPDATE tasks SET position = position + 10")
+        connection.commit()
+        reopened = SQLiteTaskRepository(connection)
+        assert [task.position for task in reopened.list_tasks()] == [10, 11]
+    finally:
+        connection.close()
+
+
+def test_sqlite_counters_ignore_a_failed_commit() -> None:
+    connection = sqlite3.connect(":memory:")
+    try:
+        repo = SQLiteTaskRepository(connection)
+        task = repo.add("ship")
+        assert task is not None
+        repo.toggle(task.id)
+
+        # A deferred foreign key makes the DELETE succeed but its COMMIT fail.
+        connection.execute("PRAGMA foreign_keys = ON")
+        connection.execute(
+            """
+            CREATE TABLE notes (
+                task_id INTEGER REFERENCES tasks(id) DEFERRABLE INITIALLY DEFERRED
+            )
+            """
+        )
+        connection.execute("INSERT INTO notes (task_id) VALUES (?)", (task.id,))
+        connection.commit()
+
+        with pytest.raises(sqlite3.IntegrityError):
+            repo.remove(task.id)
+
+        assert [existing.id for existing in repo.list_tasks()] == [task.id]
+        assert repo.completion_stats() == (1, 1)
+    finally:
+        connection.close()
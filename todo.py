@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import sqlite3
-from dataclasses import dataclass, replace
+import threading
+from dataclasses import dataclass
 from sqlite3 import Connection, Row
 from typing import Protocol
 
@@ -17,8 +18,13 @@ class Task:
 TaskId = int
 TaskList = list[Task]
 
+SCHEMA_VERSION = 1
+
 
 class TaskRepository(Protocol):
+    @property
+    def version(self) -> int: ...
+
     def list_tasks(self) -> TaskList: ...
 
     def add(self, title: str) -> Task | None: ...
@@ -38,108 +44,157 @@ def _normalise_title(title: str) -> str:
 
 class InMemoryTaskRepository:
     def __init__(self) -> None:
-        self._tasks: TaskList = []
+        self._ids: list[TaskId] = []
+        self._titles: list[str] = []
+        self._done = bytearray()
+        self._index: dict[TaskId, int] = {}
         self._next_id: TaskId = 0
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
 
     def list_tasks(self) -> TaskList:
-        return list(self._tasks)
+        return [
+            Task(id=task_id, title=title, done=bool(done), position=index)
+            for index, (task_id, title, done) in enumerate(
+                zip(self._ids, self._titles, self._done)
+            )
+        ]
 
     def add(self, title: str) -> Task | None:
         normalised = _normalise_title(title)
         if not normalised:
             return None
 
-        task = Task(
-            id=self._next_id,
-            title=normalised,
-            position=len(self._tasks),
-        )
-        self._tasks.append(task)
+        task_id = self._next_id
+        self._index[task_id] = len(self._ids)
+        self._ids.append(task_id)
+        self._titles.append(normalised)
+        self._done.append(0)
         self._next_id += 1
-        return task
+        self._version += 1
+        return self._task_at(self._index[task_id])
 
     def toggle(self, task_id: TaskId) -> Task:
-        for index, task in enumerate(self._tasks):
-            if task.id == task_id:
-                updated = replace(task, done=not task.done)
-                self._tasks[index] = updated
-                return updated
-        raise ValueError(f"Task with id {task_id} not found")
+        index = self._index.get(task_id)
+        if index is None:
+            raise ValueError(f"Task with id {task_id} not found")
+
+        self._done[index] ^= 1
+        self._version += 1
+        return self._task_at(index)
 
     def remove(self, task_id: TaskId) -> None:
-        self._tasks = [task for task in self._tasks if task.id != task_id]
-        self._reindex_positions()
+        index = self._index.pop(task_id, None)
+        if index is not None:
+            del self._ids[index]
+            del self._titles[index]
+            del self._done[index]
+            for shifted, shifted_id in enumerate(self._ids[index:], start=index):
+                self._index[shifted_id] = shifted
+        self._version += 1
 
     def completion_stats(self) -> tuple[int, int]:
-        total = len(self._tasks)
-        done = sum(task.done for task in self._tasks)
-        return int(done), total
+        return self._done.count(1), len(self._ids)
 
     def reorder(self, ordered_ids: list[TaskId]) -> TaskList:
-        if len(ordered_ids) != len(self._tasks):
+        if len(ordered_ids) != len(self._ids):
             raise ValueError("ordered_ids must include every task exactly once")
 
-        id_to_task = {task.id: task for task in self._tasks}
-        if set(ordered_ids) != set(id_to_task):
+        if set(ordered_ids) != set(self._index):
             raise ValueError("ordered_ids must include every task exactly once")
 
-        self._tasks = [
-            replace(id_to_task[task_id], position=index)
-            for index, task_id in enumerate(ordered_ids)
-        ]
+        if ordered_ids == self._ids:
+            return self.list_tasks()
+
+        order = [self._index[task_id] for task_id in ordered_ids]
+        self._ids = list(ordered_ids)
+        self._titles = [self._titles[index] for index in order]
+        self._done = bytearray(self._done[index] for index in order)
+        self._rebuild_index()
+        self._version += 1
         return self.list_tasks()
 
-    def _reindex_positions(self) -> None:
-        self._tasks = [
-            replace(task, position=index) for index, task in enumerate(self._tasks)
-        ]
+    def _task_at(self, index: int) -> Task:
+        return Task(
+            id=self._ids[index],
+            title=self._titles[index],
+            done=bool(self._done[index]),
+            position=index,
+        )
+
+    def _rebuild_index(self) -> None:
+        self._index = {task_id: index for index, task_id in enumerate(self._ids)}
 
 
 class SQLiteTaskRepository:
+    _LIST_SQL = "SELECT id, title, done, position FROM tasks ORDER BY position, id"
+
     def __init__(self, connection: Connection) -> None:
         self._connection = connection
         self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._version = 0
         self._initialise()
+        self._total, self._done = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(done), 0) FROM tasks"
+        ).fetchone()
+
+    @property
+    def version(self) -> int:
+        return self._version
 
     def list_tasks(self) -> TaskList:
-        cursor = self._connection.execute(
-            "SELECT id, title, done, position FROM tasks ORDER BY position, id"
-        )
-        rows = cursor.fetchall()
-        return [self._row_to_task(row) for row in rows]
+        # Sessions share one connection, so reads must not see a write that is
+        # still in progress (e.g. reorder's temporary negative positions).
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.row_factory = None
+            rows = cursor.execute(self._LIST_SQL).fetchall()
+        task = Task
+        return [
+            task(task_id, title, bool(done), position)
+            for task_id, title, done, position in rows
+        ]
 
     def add(self, title: str) -> Task | None:
         normalised = _normalise_title(title)
         if not normalised:
             return None
 
-        next_position_row = self._connection.execute(
-            "SELECT COALESCE(MAX(position), -1) + 1 AS next_position FROM tasks"
-        ).fetchone()
-        next_position = int(next_position_row["next_position"])
-
-        cursor = self._connection.execute(
-            "INSERT INTO tasks (title, done, position) VALUES (?, 0, ?)",
-            (normalised, next_position),
-        )
-        self._connection.commit()
-        task_id = cursor.lastrowid
-        return Task(id=task_id, title=normalised, done=False, position=next_position)
+        with self._lock:
+            with self._connection:
+                row = self._connection.execute(
+                    """
+                    INSERT INTO tasks (title, done, position)
+                    SELECT ?, 0, COALESCE(MAX(position), -1) + 1 FROM tasks
+                    RETURNING id, title, done, position
+                    """,
+                    (normalised,),
+                ).fetchone()
+            self._total += 1
+            self._version += 1
+        return self._row_to_task(row)
 
     def toggle(self, task_id: TaskId) -> Task:
-        row = self._connection.execute(
-            "SELECT id, title, done, position FROM tasks WHERE id = ?",
-            (task_id,),
-        ).fetchone()
-        if row is None:
-            raise ValueError(f"Task with id {task_id} not found")
-
-        new_done = 0 if row["done"] else 1
-        self._connection.execute(
-            "UPDATE tasks SET done = ? WHERE id = ?",
-            (new_done, task_id),
-        )
-        self._connection.commit()
+        with self._lock:
+            with self._connection:
+                row = self._connection.execute(
+                    "SELECT id, title, done, position FROM tasks WHERE id = ?",
+                    (task_id,),
+                ).fetchone()
+                if row is None:
+                    raise ValueError(f"Task with id {task_id} not found")
+
+                new_done = 0 if row["done"] else 1
+                self._connection.execute(
+                    "UPDATE tasks SET done = ? WHERE id = ?",
+                    (new_done, task_id),
+                )
+            self._done += 1 if new_done else -1
+            self._version += 1
         return Task(
             id=row["id"],
             title=row["title"],
@@ -148,64 +203,70 @@ class SQLiteTaskRepository:
         )
 
     def remove(self, task_id: TaskId) -> None:
-        self._connection.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-        self._connection.commit()
-        self._normalise_positions()
+        with self._lock:
+            with self._connection:
+                removed = self._connection.execute(
+                    "DELETE FROM tasks WHERE id = ? RETURNING done", (task_id,)
+                ).fetchone()
+                self._normalise_positions()
+            # Counters only follow the database once the commit has succeeded.
+            if removed is not None:
+                self._total -= 1
+                self._done -= removed["done"]
+            self._version += 1
 
     def completion_stats(self) -> tuple[int, int]:
-        row = self._connection.execute(
-            "SELECT COUNT(*) AS total, COALESCE(SUM(done), 0) AS done FROM tasks"
-        ).fetchone()
-        total = int(row["total"])
-        done = int(row["done"])
-        return done, total
+        return self._done, self._total
 
     def reorder(self, ordered_ids: list[TaskId]) -> TaskList:
-        existing_rows = self._connection.execute(
-            "SELECT id, position FROM tasks ORDER BY position, id"
-        ).fetchall()
-        existing_ids = [row["id"] for row in existing_rows]
-
-        if len(existing_ids) != len(ordered_ids):
-            raise ValueError("ordered_ids must include every task exactly once")
-
-        if set(existing_ids) != set(ordered_ids):
-            raise ValueError("ordered_ids must include every task exactly once")
-
-        max_position = max((int(row["position"]) for row in existing_rows), default=-1)
-        offset_base = max_position + 1
-        temp_updates = [
-            (offset_base + index, task_id)
-            for index, task_id in enumerate(ordered_ids)
-        ]
-        final_updates = [
-            (index, task_id) for index, task_id in enumerate(ordered_ids)
-        ]
-        self._connection.executemany(
-            "UPDATE tasks SET position = ? WHERE id = ?",
-            temp_updates,
-        )
-        self._connection.executemany(
-            "UPDATE tasks SET position = ? WHERE id = ?",
-            final_updates,
-        )
-        self._connection.commit()
+        with self._lock:
+            current = dict(
+                self._connection.execute("SELECT id, position FROM tasks").fetchall()
+            )
+            if len(ordered_ids) != len(current) or set(ordered_ids) != current.keys():
+                raise ValueError("ordered_ids must include every task exactly once")
+
+            changes = [
+                (index, task_id)
+                for index, task_id in enumerate(ordered_ids)
+                if current[task_id] != index
+            ]
+            if changes:
+                temp_updates = [(-1 - index, task_id) for index, task_id in changes]
+                with self._connection:
+                    self._connection.executemany(
+                        "UPDATE tasks SET position = ? WHERE id = ?",
+                        temp_updates,
+                    )
+                    self._connection.executemany(
+                        "UPDATE tasks SET position = ? WHERE id = ?",
+                        changes,
+                    )
+                self._version += 1
         return self.list_tasks()
 
     def _initialise(self) -> None:
-        self._connection.execute(
-            """
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                done INTEGER NOT NULL DEFAULT 0 CHECK(done IN (0, 1)),
-                position INTEGER NOT NULL UNIQUE
+        schema_version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if schema_version >= SCHEMA_VERSION:
+            return
+
+        with self._connection:
+            # sqlite3 only opens a transaction before DML; start one explicitly so
+            # the DDL and the user_version bump commit together.
+            self._connection.execute("BEGIN")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    done INTEGER NOT NULL DEFAULT 0 CHECK(done IN (0, 1)),
+                    position INTEGER NOT NULL UNIQUE
+                )
+                """
             )
-            """
-        )
-        self._connection.commit()
-        self._ensure_position_column()
-        self._normalise_positions()
+            self._ensure_position_column()
+            self._normalise_positions()
+            self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
     @staticmethod
     def _row_to_task(row: Row) -> Task:
@@ -221,27 +282,25 @@ class SQLiteTaskRepository:
         has_position = any(column["name"] == "position" for column in columns)
         if not has_position:
             self._connection.execute("ALTER TABLE tasks ADD COLUMN position INTEGER")
-            self._connection.commit()
             self._connection.execute("UPDATE tasks SET position = id")
-            self._connection.commit()
         self._connection.execute(
             "CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_position ON tasks(position)"
         )
-        self._connection.commit()
 
+    # Runs inside the caller's transaction; does not commit on its own.
     def _normalise_positions(self) -> None:
+        bounds = self._connection.execute(
+            "SELECT MIN(position), MAX(position), COUNT(*) FROM tasks"
+        ).fetchone()
+        min_position, max_position, total = bounds
+        if total == 0 or (min_position == 0 and max_position == total - 1):
+            return
+
         rows = self._connection.execute(
             "SELECT id, position FROM tasks ORDER BY position, id"
         ).fetchall()
         ids = [row["id"] for row in rows]
-        if not ids:
-            return
-
-        max_position = max((int(row["position"]) for row in rows), default=-1)
-        offset_base = max_position + 1
-        temp_updates = [
-            (offset_base + index, task_id) for index, task_id in enumerate(ids)
-        ]
+        temp_updates = [(-1 - index, task_id) for index, task_id in enumerate(ids)]
         final_updates = [(index, task_id) for index, task_id in enumerate(ids)]
         self._connection.executemany(
             "UPDATE tasks SET position = ? WHERE id = ?",
@@ -251,4 +310,3 @@ class SQLiteTaskRepository:
             "UPDATE tasks SET position = ? WHERE id = ?",
             final_updates,
         )
-        self._connection.commit()